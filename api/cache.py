@@ -0,0 +1,217 @@
+"""
+Redis-backed response caching for hot read endpoints.
+
+Caches serialized JSON bytes keyed by endpoint name + query arguments so
+repeat requests skip the CRUD layer entirely. Falls back to a small
+in-process TTL cache when Redis (or the redis package) is unavailable,
+so local/demo setups keep working without extra infrastructure.
+"""
+
+import asyncio
+import functools
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import orjson
+from pydantic import BaseModel
+
+try:
+    from redis import asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+KEY_PREFIX = "cache:"
+CITIES_PREFIX = KEY_PREFIX + "_cities_payload"  # invalidated after data ingest
+
+_redis_client = None
+_redis_usable = aioredis is not None
+
+# In-process fallback: key -> (expires_at, payload_bytes)
+_local_cache: Dict[str, Tuple[float, bytes]] = {}
+_LOCAL_CACHE_MAX_ENTRIES = 256
+
+# Single-flight map: key -> Future of the in-progress computation
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+async def single_flight(key: str, compute: Callable[[], Awaitable]):
+    """Deduplicate concurrent identical work: one leader computes, the
+    rest await its result.
+
+    Bursty dashboards (many tabs polling the same city) would otherwise
+    each trigger the full DB roundtrip; with single-flight only the
+    first call does, and it also guards the thundering herd on a cache
+    miss. Exceptions propagate to every waiter.
+    """
+    existing = _inflight.get(key)
+    if existing is not None:
+        return await existing
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        result = await compute()
+        future.set_result(result)
+        return result
+    except BaseException as exc:
+        future.set_exception(exc)
+        future.exception()  # mark retrieved even with no waiters
+        raise
+    finally:
+        del _inflight[key]
+
+
+def _orjson_default(obj: Any):
+    """Serialize types orjson doesn't handle natively (Pydantic models)."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """Serialize a response payload (dicts, models, dates) to JSON bytes."""
+    return orjson.dumps(value, default=_orjson_default)
+
+
+def redis_available() -> bool:
+    """Whether Redis is importable and reachable.
+
+    Accurate after init_cache() has pinged the server at startup.
+    """
+    return _redis_usable
+
+
+def get_redis():
+    """Lazily create the shared Redis client. Returns None when Redis is unusable."""
+    global _redis_client
+    if not _redis_usable:
+        return None
+    if _redis_client is None:
+        _redis_client = aioredis.from_url(
+            REDIS_URL,
+            socket_connect_timeout=1,
+            socket_timeout=1
+        )
+    return _redis_client
+
+
+def _mark_redis_unusable(error: Exception):
+    """Disable Redis for this process after a connection failure."""
+    global _redis_usable
+    if _redis_usable:
+        print(f"Redis unavailable ({error}), using in-process cache fallback")
+    _redis_usable = False
+
+
+async def init_cache():
+    """Verify Redis connectivity at startup and bound its memory usage.
+
+    Best-effort sets maxmemory-policy to allkeys-lru so the cache evicts
+    old entries instead of growing unbounded. Managed Redis instances may
+    reject CONFIG SET; that is fine, eviction policy is then up to the host.
+    """
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        await client.ping()
+        try:
+            await client.config_set("maxmemory-policy", "allkeys-lru")
+        except Exception:
+            pass  # CONFIG may be disabled (e.g. managed Redis)
+        print(f"Redis cache connected: {REDIS_URL}")
+    except Exception as e:
+        _mark_redis_unusable(e)
+
+
+def cache_key(func_name: str, kwargs: Dict[str, Any]) -> str:
+    """Build a cache key from endpoint name + primitive query arguments.
+
+    Non-primitive values (e.g. the injected DB session) are skipped.
+    """
+    parts = [KEY_PREFIX + func_name]
+    for name in sorted(kwargs):
+        value = kwargs[name]
+        if value is None or isinstance(value, (str, int, float, bool)):
+            parts.append(f"{name}={value}")
+    return ":".join(parts)
+
+
+async def cache_get(key: str) -> Optional[bytes]:
+    client = get_redis()
+    if client is not None:
+        try:
+            return await client.get(key)
+        except Exception as e:
+            _mark_redis_unusable(e)
+
+    entry = _local_cache.get(key)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+
+async def cache_set(key: str, payload: bytes, ttl: int):
+    client = get_redis()
+    if client is not None:
+        try:
+            await client.setex(key, ttl, payload)
+            return
+        except Exception as e:
+            _mark_redis_unusable(e)
+
+    if len(_local_cache) >= _LOCAL_CACHE_MAX_ENTRIES:
+        now = time.monotonic()
+        for stale_key in [k for k, (exp, _) in _local_cache.items() if exp <= now]:
+            del _local_cache[stale_key]
+    _local_cache[key] = (time.monotonic() + ttl, payload)
+
+
+def redis_cache(ttl: int = 120) -> Callable:
+    """Cache an async endpoint's JSON payload for `ttl` seconds.
+
+    On a hit the stored bytes are deserialized and returned directly,
+    skipping the handler (and its DB queries) entirely.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = cache_key(func.__name__, kwargs)
+            cached = await cache_get(key)
+            if cached is not None:
+                return orjson.loads(cached)
+
+            # Miss: single-flight so concurrent identical requests share
+            # one handler invocation instead of stampeding the DB
+            async def compute():
+                result = await func(*args, **kwargs)
+                await cache_set(key, dumps(result), ttl)
+                return result
+
+            return await single_flight(key, compute)
+        return wrapper
+    return decorator
+
+
+async def invalidate_prefix(prefix: str) -> int:
+    """Delete all cached entries whose keys start with `prefix`.
+
+    Used after data ingest so stale city summaries are not served
+    for the remainder of their TTL. Returns the number of keys deleted.
+    """
+    deleted = 0
+    client = get_redis()
+    if client is not None:
+        try:
+            async for key in client.scan_iter(match=prefix + "*"):
+                await client.delete(key)
+                deleted += 1
+        except Exception as e:
+            _mark_redis_unusable(e)
+
+    for key in [k for k in _local_cache if k.startswith(prefix)]:
+        del _local_cache[key]
+        deleted += 1
+    return deleted
@@ -2,11 +2,17 @@
 CRUD operations for database queries.
 """
 
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, and_, or_
+import asyncio
+import time
+
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy import select, func, desc, and_, or_, lambda_stmt
 from typing import Optional, List, Dict
 from datetime import datetime, date, timedelta
-from . import models, schemas
+from . import cache, models, schemas
+from .database import SessionLocal
 
 
 def _parse_date(date_val) -> Optional[date]:
@@ -28,106 +34,131 @@ def _parse_date(date_val) -> Optional[date]:
     return None
 
 
-def get_latest_air_quality(db: Session, city: str, state: Optional[str] = None):
-    """Get latest air quality data for a city."""
-    query = db.query(models.AirQualityDaily).filter(
-        models.AirQualityDaily.city.ilike(f"%{city}%")
-    )
+async def get_latest_air_quality(db: AsyncSession, city: str, state: Optional[str] = None):
+    """Get latest air quality data for a city.
+
+    Built as a lambda statement: these queries only differ between
+    requests in their bound parameters, so the Core-to-SQL compilation
+    is done once per process instead of on every call.
+    """
+    city_pattern = f"%{city}%"
+    stmt = lambda_stmt(lambda: select(models.AirQualityDaily).where(
+        models.AirQualityDaily.city.ilike(city_pattern)
+    ))
     if state:
-        query = query.filter(models.AirQualityDaily.state.ilike(f"%{state}%"))
+        state_pattern = f"%{state}%"
+        stmt += lambda s: s.where(models.AirQualityDaily.state.ilike(state_pattern))
 
-    return query.order_by(desc(models.AirQualityDaily.date)).first()
+    stmt += lambda s: s.order_by(desc(models.AirQualityDaily.date)).limit(1)
+    result = await db.execute(stmt)
+    return result.scalars().first()
 
 
-def get_latest_traffic(db: Session, days_back: int = 30):
+async def get_latest_traffic(db: AsyncSession, days_back: int = 30):
     """Get latest traffic data (most recent date)."""
-    return db.query(models.TrafficDaily).order_by(desc(models.TrafficDaily.date)).first()
+    stmt = lambda_stmt(lambda: select(models.TrafficDaily).order_by(
+        desc(models.TrafficDaily.date)
+    ).limit(1))
+    result = await db.execute(stmt)
+    return result.scalars().first()
 
 
-def get_latest_respiratory(db: Session, geographic_agg: Optional[str] = None):
+async def get_latest_respiratory(db: AsyncSession, geographic_agg: Optional[str] = None):
     """Get latest respiratory data."""
-    query = db.query(models.RespiratoryWeekly)
+    stmt = lambda_stmt(lambda: select(models.RespiratoryWeekly))
     if geographic_agg:
-        query = query.filter(models.RespiratoryWeekly.geographic_aggregation == geographic_agg)
-    return query.order_by(desc(models.RespiratoryWeekly.week_ending_date)).first()
+        stmt += lambda s: s.where(models.RespiratoryWeekly.geographic_aggregation == geographic_agg)
+    stmt += lambda s: s.order_by(desc(models.RespiratoryWeekly.week_ending_date)).limit(1)
+    result = await db.execute(stmt)
+    return result.scalars().first()
 
 
-def get_avg_agriculture_volatility(db: Session, state: Optional[str] = None, days: int = 7):
+async def get_avg_agriculture_volatility(db: AsyncSession, state: Optional[str] = None, days: int = 7):
     """Get average agriculture price volatility for recent period."""
     cutoff_date = date.today() - timedelta(days=days)
 
-    query = db.query(func.avg(models.AgricultureDaily.price_volatility_30d)).filter(
+    stmt = select(func.avg(models.AgricultureDaily.price_volatility_30d)).where(
         models.AgricultureDaily.date >= cutoff_date,
         models.AgricultureDaily.price_volatility_30d.isnot(None)
     )
 
     if state:
-        query = query.filter(models.AgricultureDaily.state.ilike(f"%{state}%"))
+        stmt = stmt.where(models.AgricultureDaily.state.ilike(f"%{state}%"))
+
+    result = await db.execute(stmt)
+    value = result.scalar()
+    return value if value else 0.0
 
-    result = query.scalar()
-    return result if result else 0.0
 
+async def get_latest_agriculture(db: AsyncSession, state: str):
+    """Get latest agriculture record for a state (any commodity)."""
+    stmt = select(models.AgricultureDaily).where(
+        models.AgricultureDaily.state.ilike(f"%{state}%")
+    ).order_by(desc(models.AgricultureDaily.date)).limit(1)
+    result = await db.execute(stmt)
+    return result.scalars().first()
 
-def get_historical_analytics(db: Session, hours: int = 24, city: Optional[str] = None):
+
+async def get_historical_analytics(db: AsyncSession, hours: int = 24, city: Optional[str] = None):
     """Get historical analytics data.
-    
+
     Falls back to most recent N records if no data within the specified hours.
     """
     cutoff_date = datetime.now() - timedelta(hours=hours)
     cutoff_date = cutoff_date.date()
 
-    # Get analytics data within cutoff
-    analytics_query = db.query(models.AnalyticsDaily).filter(
+    # Get analytics data within cutoff (lambda statement: compiled once,
+    # cutoff_date is tracked as a bound parameter)
+    stmt = lambda_stmt(lambda: select(models.AnalyticsDaily).where(
         models.AnalyticsDaily.date >= cutoff_date
-    ).order_by(models.AnalyticsDaily.date)
+    ).order_by(models.AnalyticsDaily.date))
 
-    analytics_data = analytics_query.all()
+    result = await db.execute(stmt)
+    analytics_data = result.scalars().all()
 
     # Fallback: if no recent data, get the most recent N records anyway (for demo purposes)
     if not analytics_data:
         # Get most recent records to fill the gap
-        fallback_query = db.query(models.AnalyticsDaily).order_by(
+        fallback_limit = min(hours, 100)  # Limit to hours count or 100 max
+        fallback_stmt = lambda_stmt(lambda: select(models.AnalyticsDaily).order_by(
             models.AnalyticsDaily.date.desc()
-        ).limit(min(hours, 100))  # Limit to hours count or 100 max
-        analytics_data = list(reversed(fallback_query.all()))  # Reverse to get chronological order
-
-    # If city specified, try to get city-specific AQ data and merge
-    if city:
-        aq_query = db.query(models.AirQualityDaily).filter(
-            models.AirQualityDaily.city.ilike(f"%{city}%"),
-            models.AirQualityDaily.date >= cutoff_date
-        ).order_by(models.AirQualityDaily.date)
-
-        # For now, return analytics (can be enhanced to merge city-specific data)
-        return analytics_data
+        ).limit(fallback_limit))
+        result = await db.execute(fallback_stmt)
+        analytics_data = list(reversed(result.scalars().all()))  # Reverse to get chronological order
 
     return analytics_data
 
 
-def get_cities_list(db: Session):
-    """Get list of all cities with summary data."""
-    # Get unique cities from air quality data
-    # Query just city and state, then get latest dates separately
-    cities_query = db.query(
-        models.AirQualityDaily.city,
-        models.AirQualityDaily.state
-    ).distinct().order_by(models.AirQualityDaily.city)
+async def get_cities_list(db: AsyncSession):
+    """Get list of all cities with summary data.
 
-    cities_raw = cities_query.all()
+    Uses a constant number of queries regardless of city count: the
+    latest air-quality row per city comes from one window-function
+    query, and the city-independent traffic/respiratory lookups are
+    done once instead of once per city (the old per-city loop was a
+    classic N+1 pattern).
+    """
+    # Latest air-quality row per (city, state) in a single query
+    row_num = func.row_number().over(
+        partition_by=(models.AirQualityDaily.city, models.AirQualityDaily.state),
+        order_by=desc(models.AirQualityDaily.date)
+    ).label("row_num")
+    subq = select(models.AirQualityDaily, row_num).subquery()
+    latest_aq_alias = aliased(models.AirQualityDaily, subq)
+    stmt = select(latest_aq_alias).where(subq.c.row_num == 1).order_by(latest_aq_alias.city)
+
+    result = await db.execute(stmt)
+    latest_aq_rows = result.scalars().all()
+
+    # These do not depend on the city, so fetch them once
+    latest_resp = await get_latest_respiratory(db)
+    latest_traffic = await get_latest_traffic(db)
 
     cities = []
-    for city_row in cities_raw:
-        city_name = city_row.city.lower()
-
-        # Get latest data for each domain
-        latest_aq = get_latest_air_quality(db, city_row.city, city_row.state)
-        latest_resp = get_latest_respiratory(db)
-        latest_traffic = get_latest_traffic(db)
-        avg_volatility = get_avg_agriculture_volatility(db, city_row.state, days=7)
-
+    for latest_aq in latest_aq_rows:
         # Determine data freshness
         data_freshness = {
-            'air_quality': _parse_date(latest_aq.date) if latest_aq else None,
+            'air_quality': _parse_date(latest_aq.date),
             'respiratory': _parse_date(latest_resp.week_ending_date) if latest_resp else None,
             'traffic': _parse_date(latest_traffic.date) if latest_traffic else None,
             'agriculture': date.today() - timedelta(days=7)  # Approximation
@@ -135,15 +166,15 @@ def get_cities_list(db: Session):
 
         # Check if has recent data (within last 30 days)
         has_recent = any(
-            d and (date.today() - d).days <= 30 
-            for d in [data_freshness['air_quality'], data_freshness['respiratory'], 
+            d and (date.today() - d).days <= 30
+            for d in [data_freshness['air_quality'], data_freshness['respiratory'],
                       data_freshness['traffic'], data_freshness['agriculture']]
         )
 
         cities.append({
-            'city': city_row.city,
-            'state': city_row.state,
-            'latest_aqi': latest_aq.avg_us_aqi if latest_aq else None,
+            'city': latest_aq.city,
+            'state': latest_aq.state,
+            'latest_aqi': latest_aq.avg_us_aqi,
             'latest_traffic_congestion': latest_traffic.avg_traffic_congestion_index if latest_traffic else None,
             'latest_respiratory_risk': latest_resp.respiratory_risk_index if latest_resp else None,
             'data_freshness': data_freshness,
@@ -153,22 +184,36 @@ def get_cities_list(db: Session):
     return cities
 
 
-def get_city_current_state(db: Session, city: str, state: Optional[str] = None):
-    """Get comprehensive current state for a city."""
-    # Get latest data from database tables
-    aq_data = get_latest_air_quality(db, city, state)
-    traffic_data = get_latest_traffic(db)
-    resp_data = get_latest_respiratory(db)
-    avg_volatility = get_avg_agriculture_volatility(db, state, days=7)
-    
+async def _in_own_session(query_fn, *args, **kwargs):
+    """Run a CRUD query on its own pooled session.
+
+    A single AsyncSession cannot execute statements concurrently, so
+    queries that should overlap each check a session out of the pool.
+    """
+    async with SessionLocal() as session:
+        return await query_fn(session, *args, **kwargs)
+
+
+async def get_city_current_state(db: AsyncSession, city: str, state: Optional[str] = None):
+    """Get comprehensive current state for a city.
+
+    The four base lookups are independent, so they run concurrently on
+    separate pooled sessions: wall-clock time is the slowest query
+    rather than the sum of all four.
+    """
+    aq_data, traffic_data, resp_data, avg_volatility = await asyncio.gather(
+        _in_own_session(get_latest_air_quality, city, state),
+        _in_own_session(get_latest_traffic),
+        _in_own_session(get_latest_respiratory),
+        _in_own_session(get_avg_agriculture_volatility, state, days=7),
+    )
+
     # NEW: Get latest agriculture data for supply/price details
     # We query the latest record for any commodity in this state to get general agricultural health
     agri_data = None
     if state or (aq_data and aq_data.state):
         search_state = state or aq_data.state
-        agri_data = db.query(models.AgricultureDaily).filter(
-            models.AgricultureDaily.state.ilike(f"%{search_state}%")
-        ).order_by(desc(models.AgricultureDaily.date)).first()
+        agri_data = await get_latest_agriculture(db, search_state)
 
     # Build response
     current_state = {
@@ -197,7 +242,7 @@ def get_city_current_state(db: Session, city: str, state: Optional[str] = None):
         'avg_food_price_volatility': float(avg_volatility) if avg_volatility else None,
         'crop_supply_index': 100.0 - (agri_data.price_volatility * 100) if agri_data and agri_data.price_volatility else 50.0, # NEW: Derived proxy
         'food_price_index': agri_data.Modal_Price if agri_data else None, # NEW
-        
+
         'data_freshness': {
             'air_quality': _parse_date(aq_data.date) if aq_data else None,
             'respiratory': _parse_date(resp_data.week_ending_date) if resp_data else None,
@@ -217,3 +262,68 @@ def get_city_current_state(db: Session, city: str, state: Optional[str] = None):
             current_state['congestion_level'] = 'high'
 
     return current_state
+
+
+CURRENT_STATE_TTL = 60
+
+
+async def get_city_current_state_cached(db: AsyncSession, city: str, state: Optional[str] = None):
+    """Memoized get_city_current_state shared across endpoints.
+
+    /current-state, /risk-assessment and /scenario all start from the
+    same snapshot, so keying it on (city, state, minute bucket) turns a
+    dashboard poll followed by a scenario run into one DB fetch instead
+    of two. Entries live in Redis (60s TTL) so workers share them, with
+    the usual in-process fallback when Redis is down.
+    """
+    bucket = int(time.time() // 60)
+    key = f"{cache.KEY_PREFIX}current_state:{city}:{state}:{bucket}"
+
+    payload = await cache.cache_get(key)
+    if payload is not None:
+        current_state = orjson.loads(payload)
+        # Restore what the JSON round-trip flattened: a fresh timestamp
+        # (the uncached path stamps datetime.now()) and date-typed freshness
+        current_state['timestamp'] = datetime.now()
+        current_state['data_freshness'] = {
+            name: _parse_date(value)
+            for name, value in current_state['data_freshness'].items()
+        }
+        return current_state
+
+    async def compute():
+        current_state = await get_city_current_state(db, city, state)
+        await cache.cache_set(key, cache.dumps(current_state), CURRENT_STATE_TTL)
+        return current_state
+
+    return await cache.single_flight(key, compute)
+
+
+async def stream_historical_analytics(db: AsyncSession, hours: int = 24, city: Optional[str] = None):
+    """Stream analytics rows from a server-side cursor, oldest first.
+
+    Streaming counterpart of get_historical_analytics for large windows:
+    rows are fetched in blocks of 64 instead of materializing the whole
+    result, including the same most-recent-records fallback when nothing
+    lies within the window.
+    """
+    cutoff_date = (datetime.now() - timedelta(hours=hours)).date()
+
+    stmt = select(models.AnalyticsDaily).where(
+        models.AnalyticsDaily.date >= cutoff_date
+    ).order_by(models.AnalyticsDaily.date).execution_options(yield_per=64)
+
+    yielded = False
+    result = await db.stream(stmt)
+    async for record in result.scalars():
+        yielded = True
+        yield record
+
+    if not yielded:
+        fallback_limit = min(hours, 100)
+        fallback_stmt = select(models.AnalyticsDaily).order_by(
+            models.AnalyticsDaily.date.desc()
+        ).limit(fallback_limit)
+        result = await db.execute(fallback_stmt)
+        for record in reversed(result.scalars().all()):
+            yield record
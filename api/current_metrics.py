@@ -1,6 +1,6 @@
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from . import crud
 
 def calculate_data_freshness(timestamp: Optional[datetime]) -> str:
@@ -58,7 +58,7 @@ def format_timestamp_ago(timestamp: Optional[datetime]) -> str:
     else:
         return "Estimated"  # Hide specific days for very old data to avoid user confusion
 
-def fetch_current_metrics(db: Session, city: str = "Mumbai", state: str = "Maharashtra") -> Dict[str, Any]:
+async def fetch_current_metrics(db: AsyncSession, city: str = "Mumbai", state: str = "Maharashtra") -> Dict[str, Any]:
     """
     Fetch the latest current metrics for a specific city (Strictly Defaults to Mumbai).
     Ensures NO null values are returned.
@@ -70,7 +70,7 @@ def fetch_current_metrics(db: Session, city: str = "Mumbai", state: str = "Mahar
 
     # Fetch from DB via CRUD
     # We use the existing aggregate function but will post-process strictly
-    db_data = crud.get_city_current_state(db, target_city, target_state)
+    db_data = await crud.get_city_current_state_cached(db, target_city, target_state)
     
     # Defaults / Fallbacks (Estimates for Mumbai)
     # Based on typical averages for Mumbai
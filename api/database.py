@@ -2,9 +2,8 @@
 Database configuration and session management.
 """
 
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 import os
 from pathlib import Path
 
@@ -12,26 +11,30 @@ from pathlib import Path
 BASE_DIR = Path(__file__).parent.parent
 DATABASE_PATH = BASE_DIR / "urban_intelligence.db"
 
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+SQLALCHEMY_DATABASE_URL = f"sqlite+aiosqlite:///{DATABASE_PATH}"
 
-# Create engine
-engine = create_engine(
+# Create async engine so DB I/O never blocks the event loop under
+# concurrent requests. Pool is sized for ~30 concurrent sessions and
+# recycles/pings connections so stale handles are never handed out.
+engine = create_async_engine(
     SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},  # Needed for SQLite
+    pool_size=20,
+    max_overflow=10,
+    pool_pre_ping=True,
+    pool_recycle=3600,
+    query_cache_size=1200,  # SQL compilation cache for the hot CRUD statements
     echo=False  # Set to True for SQL query logging
 )
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create session factory (expire_on_commit=False so returned objects
+# stay usable after the session closes, without extra refresh queries)
+SessionLocal = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
 
 # Base class for models
 Base = declarative_base()
 
 
-def get_db():
-    """Dependency to get database session."""
-    db = SessionLocal()
-    try:
+async def get_db():
+    """Dependency to get async database session."""
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
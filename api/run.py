@@ -1,5 +1,8 @@
 """
-Run script for FastAPI server.
+Run script for FastAPI server (development, single worker + reload).
+
+For production use `python -m api.main`, which starts multiple uvicorn
+workers on uvloop/httptools.
 """
 
 import uvicorn
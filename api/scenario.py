@@ -6,23 +6,13 @@ from typing import Dict, Optional
 from . import risk_assessment
 
 
-def simulate_scenario(
-    baseline_state: Dict,
-    modifications: Dict,
-    baseline_risks: Dict
-) -> Dict:
+def apply_modifications(baseline_state: Dict, modifications: Dict) -> Dict:
     """
-    Simulate scenario by applying modifications and recalculating risks.
+    Build the intervention state by applying modifications to the baseline.
 
-    Args:
-        baseline_state: Original current state
-        modifications: Changes to apply (aqi, traffic_volume, etc.)
-        baseline_risks: Baseline risk assessment
-
-    Returns:
-        Scenario simulation results
+    Derived indices (AQI severity, congestion, volatility, respiratory
+    risk) are recalculated from the modified raw values.
     """
-    # Create intervention state by applying modifications
     intervention_state = baseline_state.copy()
 
     # Apply modifications
@@ -74,8 +64,34 @@ def simulate_scenario(
         cases = modifications['respiratory_cases']
         intervention_state['respiratory_risk_index'] = min((cases / 1000.0) * 100, 100)
 
+    return intervention_state
+
+
+def simulate_scenario(
+    baseline_state: Dict,
+    modifications: Dict,
+    baseline_risks: Dict,
+    intervention_risks: Optional[Dict] = None
+) -> Dict:
+    """
+    Simulate scenario by applying modifications and recalculating risks.
+
+    Args:
+        baseline_state: Original current state
+        modifications: Changes to apply (aqi, traffic_volume, etc.)
+        baseline_risks: Baseline risk assessment
+        intervention_risks: Pre-computed intervention risks (e.g. from a
+            batched assessment alongside the baseline); computed here if
+            not supplied
+
+    Returns:
+        Scenario simulation results
+    """
+    intervention_state = apply_modifications(baseline_state, modifications)
+
     # Recalculate risks with intervention state
-    intervention_risks = risk_assessment.compute_risk_assessment(intervention_state)
+    if intervention_risks is None:
+        intervention_risks = risk_assessment.compute_risk_assessment(intervention_state)
 
     # Calculate improvements
     improvements = {}
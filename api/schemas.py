@@ -2,7 +2,7 @@
 Pydantic schemas for request/response validation.
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict, Any, Literal
 from datetime import date, datetime
 
@@ -38,10 +38,11 @@ class CurrentStateResponse(BaseModel):
     timestamps: Optional[Dict[str, str]] = None  # Detailed formatted timestamps
     
     # Relax data_freshness to allow string (overall status) or dict (per-domain)
-    data_freshness: Any 
-    
-    class Config:
-        from_attributes = True
+    data_freshness: Any
+
+    # Server-built payloads are trusted, so handlers construct this model
+    # with model_construct(); extra keys from the CRUD dicts are dropped
+    model_config = ConfigDict(from_attributes=True, extra="ignore", validate_assignment=False)
 
 
 # Risk Assessment Schemas
@@ -0,0 +1,159 @@
+"""
+Standalone demo data simulator.
+
+Generates the same Mumbai-like sample stream as the old in-loop
+simulator, but runs as its own process so sampling work never runs on
+(or stalls) the API server's event loop. Samples are published on a
+Redis channel when Redis is reachable — every API worker subscribes,
+so the stream fans out across a multi-worker deployment — and fed to
+the /ws/data-ingest WebSocket otherwise (which reaches exactly one
+worker, fine for single-worker setups).
+
+Normally spawned by websocket_routes.start_simulator() at API startup;
+can also be run directly with `python -m api.simulator` against a
+server elsewhere via the REDIS_URL / SIMULATOR_INGEST_URL environment
+variables.
+"""
+
+import asyncio
+import json
+import os
+import random
+
+try:
+    from redis import asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+try:
+    import websockets
+except ImportError:  # ships with uvicorn[standard]
+    websockets = None
+
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+INGEST_CHANNEL = "realtime:ingest"
+INGEST_URL = os.environ.get("SIMULATOR_INGEST_URL", "ws://127.0.0.1:8000/ws/data-ingest")
+UPDATE_INTERVAL_SECONDS = 5
+CONNECT_RETRY_SECONDS = 5
+MAX_CONNECT_ATTEMPTS = 60
+
+
+class DemoSampler:
+    """Random-walk sampler reproducing the in-process demo stream."""
+
+    def __init__(self):
+        # Base values (simulating Mumbai-like conditions)
+        self.base_aqi = 180
+        self.base_temp = 28
+        self.base_humidity = 65
+        self.base_hospital_load = 0.65
+        self.base_respiratory = 120
+        self.base_volatility = 0.12
+        self.base_supply = 85
+
+    def sample(self):
+        """Return the domain payloads for one tick."""
+        payloads = [{
+            "domain": "environmental",
+            "aqi": self.base_aqi + random.uniform(-20, 20),
+            "temperature": self.base_temp + random.uniform(-2, 2),
+            "humidity": self.base_humidity + random.uniform(-5, 5),
+        }]
+
+        if random.random() > 0.5:
+            payloads.append({
+                "domain": "health",
+                "hospital_load": min(1.0, max(0.3, self.base_hospital_load + random.uniform(-0.1, 0.1))),
+                "respiratory_cases": int(self.base_respiratory + random.uniform(-15, 15)),
+            })
+
+        if random.random() > 0.7:
+            payloads.append({
+                "domain": "food",
+                "price_volatility": max(0, min(0.5, self.base_volatility + random.uniform(-0.05, 0.05))),
+                "supply_index": max(50, min(100, self.base_supply + random.uniform(-5, 5))),
+            })
+
+        # Occasionally shift base values to create trends
+        if random.random() > 0.9:
+            self.base_aqi += random.uniform(-10, 10)
+            self.base_aqi = max(50, min(300, self.base_aqi))
+
+        if random.random() > 0.95:
+            self.base_hospital_load += random.uniform(-0.1, 0.1)
+            self.base_hospital_load = max(0.3, min(0.9, self.base_hospital_load))
+
+        return payloads
+
+
+async def _publish_to_redis(client):
+    """Publish samples on the shared Redis channel.
+
+    Every API worker runs a subscriber, so each sample reaches all
+    workers regardless of which one spawned the simulator.
+    """
+    sampler = DemoSampler()
+    while True:
+        try:
+            for payload in sampler.sample():
+                await client.publish(INGEST_CHANNEL, json.dumps(payload))
+            await asyncio.sleep(UPDATE_INTERVAL_SECONDS)
+        except (ConnectionError, OSError):
+            await asyncio.sleep(CONNECT_RETRY_SECONDS)  # Redis hiccup; retry
+
+
+async def _connect_websocket():
+    """Connect to the ingest endpoint, retrying while the API boots."""
+    for _ in range(MAX_CONNECT_ATTEMPTS):
+        try:
+            return await websockets.connect(INGEST_URL)
+        except OSError:
+            await asyncio.sleep(CONNECT_RETRY_SECONDS)
+    raise ConnectionError(f"Could not reach ingest endpoint: {INGEST_URL}")
+
+
+async def _feed_ingest_websocket():
+    """Feed samples through /ws/data-ingest (single-worker transport)."""
+    sampler = DemoSampler()
+    while True:
+        try:
+            async with await _connect_websocket() as connection:
+                while True:
+                    for payload in sampler.sample():
+                        await connection.send(json.dumps(payload))
+                        await connection.recv()  # drain the ack
+                    await asyncio.sleep(UPDATE_INTERVAL_SECONDS)
+        except websockets.ConnectionClosed:
+            await asyncio.sleep(CONNECT_RETRY_SECONDS)  # API restarting; reconnect
+
+
+async def run():
+    # Prefer Redis pub/sub so multi-worker deployments all see the
+    # stream; fall back to the ingest WebSocket without it
+    if aioredis is not None:
+        client = aioredis.from_url(REDIS_URL, socket_connect_timeout=1, socket_timeout=5)
+        try:
+            await client.ping()
+        except Exception:
+            await client.aclose()
+        else:
+            await _publish_to_redis(client)
+            return
+
+    if websockets is None:
+        raise SystemExit(
+            "The simulator needs either a reachable Redis (REDIS_URL) or "
+            "the websockets package (installed with uvicorn[standard])"
+        )
+    await _feed_ingest_websocket()
+
+
+def main():
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
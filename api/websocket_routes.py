@@ -3,12 +3,19 @@ WebSocket routes for real-time data ingestion and prediction broadcasting.
 """
 
 import asyncio
+import importlib.util
 import json
+import os
 import random
+import subprocess
+import sys
+import tempfile
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from . import cache
 from .realtime import get_state_manager, RealtimeUpdate
+from .simulator import INGEST_CHANNEL
 
 router = APIRouter()
 
@@ -89,6 +96,21 @@ async def websocket_predictions(websocket: WebSocket):
         manager.disconnect(websocket)
 
 
+def _apply_domain_update(state_manager, payload) -> Optional[bool]:
+    """Dispatch a domain-tagged update to the state manager.
+
+    Returns whether the state changed, or None for an unknown domain.
+    """
+    domain = payload.get("domain", "").lower()
+    if domain == "environmental":
+        return state_manager.update_environmental(payload)
+    if domain == "health":
+        return state_manager.update_health(payload)
+    if domain == "food":
+        return state_manager.update_food(payload)
+    return None
+
+
 @router.websocket("/ws/data-ingest")
 async def websocket_data_ingest(websocket: WebSocket):
     """
@@ -105,20 +127,13 @@ async def websocket_data_ingest(websocket: WebSocket):
             
             try:
                 payload = json.loads(data)
-                domain = payload.get("domain", "").lower()
-                
+
                 # Update appropriate domain
-                changed = False
-                if domain == "environmental":
-                    changed = state_manager.update_environmental(payload)
-                elif domain == "health":
-                    changed = state_manager.update_health(payload)
-                elif domain == "food":
-                    changed = state_manager.update_food(payload)
-                else:
+                changed = _apply_domain_update(state_manager, payload)
+                if changed is None:
                     await websocket.send_text(json.dumps({
                         "type": "error",
-                        "message": f"Unknown domain: {domain}"
+                        "message": f"Unknown domain: {payload.get('domain', '')}"
                     }))
                     continue
                 
@@ -213,23 +228,178 @@ async def simulate_realtime_data():
         await asyncio.sleep(5)  # Update every 5 seconds
 
 
-# Background task reference
+# Background task / subprocess references
 _simulator_task = None
+_simulator_process: Optional[subprocess.Popen] = None
+_ingest_consumer_task = None
+
+# Lock file electing the one worker that spawns the simulator
+_SIMULATOR_LOCK = os.path.join(tempfile.gettempdir(), "urban_intelligence_simulator.lock")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except OSError:
+        return False
+
+
+def _acquire_simulator_lock() -> bool:
+    """Elect one simulator owner across uvicorn workers.
+
+    startup_event runs in every worker, and the production launcher
+    starts one worker per core — without a guard each worker would
+    spawn its own simulator and multiply demo ingest traffic. Workers
+    race to create a pid lock file; losers skip the spawn. The lock
+    holds the simulator child's pid (see _record_simulator_pid), so it
+    is only reclaimed once the simulator itself is gone — a crashed
+    worker may leave its child running.
+    """
+    while True:
+        try:
+            fd = os.open(_SIMULATOR_LOCK, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            return True
+        except FileExistsError:
+            owner_pid = _read_simulator_lock()
+            if owner_pid and _pid_alive(owner_pid):
+                return False
+            try:
+                os.unlink(_SIMULATOR_LOCK)  # stale lock from a dead process
+            except OSError:
+                return False
+
+
+def _read_simulator_lock() -> int:
+    try:
+        with open(_SIMULATOR_LOCK) as lock_file:
+            return int(lock_file.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def _record_simulator_pid(pid: int):
+    """Point the lock at the spawned simulator rather than this worker."""
+    try:
+        with open(_SIMULATOR_LOCK, "w") as lock_file:
+            lock_file.write(str(pid))
+    except OSError:
+        pass
+
+
+def _release_simulator_lock(pid: int):
+    try:
+        if _read_simulator_lock() == pid:
+            os.unlink(_SIMULATOR_LOCK)
+    except OSError:
+        pass
+
+
+async def _consume_ingest_updates():
+    """Apply simulator updates published on the Redis ingest channel.
+
+    Every worker runs one consumer, so predictions reach /ws/predictions
+    clients (and /api/v1/realtime-trends) on all workers even though a
+    single simulator process publishes the stream.
+    """
+    state_manager = get_state_manager()
+    while True:
+        try:
+            pubsub = cache.get_redis().pubsub()
+            await pubsub.subscribe(INGEST_CHANNEL)
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    payload = json.loads(message["data"])
+                except (TypeError, ValueError):
+                    continue
+                if _apply_domain_update(state_manager, payload):
+                    prediction = await state_manager.run_inference()
+                    if prediction:
+                        await state_manager.broadcast_prediction(prediction)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            await asyncio.sleep(5)  # Redis hiccup: resubscribe
+
+
+def _spawn_simulator() -> bool:
+    """Spawn the simulator subprocess if this worker wins the lock."""
+    global _simulator_process
+    if _simulator_process is not None and _simulator_process.poll() is None:
+        return True
+    if not _acquire_simulator_lock():
+        return False
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    _simulator_process = subprocess.Popen(
+        [sys.executable, "-m", "api.simulator"],
+        cwd=project_root
+    )
+    _record_simulator_pid(_simulator_process.pid)
+    return True
 
 
 def start_simulator():
-    """Start the demo data simulator as a background task."""
-    global _simulator_task
+    """Start the demo data simulator off the API's event loop.
+
+    The sampler used to run as a task on each worker's event loop,
+    where a CPU spike in generation stalled HTTP handlers. The
+    transport now depends on what is available:
+
+    * Redis reachable: one lock-elected worker spawns the simulator
+      subprocess, which publishes on a Redis channel; every worker runs
+      a subscriber feeding its own state manager, so the stream reaches
+      clients on all workers.
+    * No Redis, single worker: the subprocess feeds the /ws/data-ingest
+      WebSocket directly (that connection lands on the only worker).
+    * No Redis, multiple workers (or no websockets client): fall back
+      to the baseline in-loop sampler in every worker — without Redis
+      there is no cross-worker fan-out, so each worker keeps its own
+      feed. Worker count is read from WEB_CONCURRENCY, which the
+      python -m api.main launcher exports.
+    """
+    global _simulator_task, _ingest_consumer_task
+
+    loop = asyncio.get_event_loop()
+
+    if cache.redis_available():
+        if _ingest_consumer_task is None or _ingest_consumer_task.done():
+            _ingest_consumer_task = loop.create_task(_consume_ingest_updates())
+        if _spawn_simulator():
+            print(f"Real-time data simulator started (pid {_simulator_process.pid}, redis fan-out)")
+        else:
+            print("Real-time data simulator running in another worker (subscribed)")
+        return _simulator_process
+
+    workers = int(os.environ.get("WEB_CONCURRENCY", "1") or 1)
+    if workers == 1 and importlib.util.find_spec("websockets") is not None:
+        if _spawn_simulator():
+            print(f"Real-time data simulator started (pid {_simulator_process.pid})")
+        else:
+            print("Real-time data simulator already running")
+        return _simulator_process
+
     if _simulator_task is None or _simulator_task.done():
-        loop = asyncio.get_event_loop()
         _simulator_task = loop.create_task(simulate_realtime_data())
-        print("Real-time data simulator started")
+        print("Real-time data simulator started (in-process fallback)")
     return _simulator_task
 
 
 def stop_simulator():
     """Stop the demo data simulator."""
-    global _simulator_task
+    global _simulator_task, _simulator_process, _ingest_consumer_task
+    if _ingest_consumer_task is not None and not _ingest_consumer_task.done():
+        _ingest_consumer_task.cancel()
+        _ingest_consumer_task = None
+    if _simulator_process is not None and _simulator_process.poll() is None:
+        simulator_pid = _simulator_process.pid
+        _simulator_process.terminate()
+        _simulator_process = None
+        _release_simulator_lock(simulator_pid)
+        print("Real-time data simulator stopped")
     if _simulator_task and not _simulator_task.done():
         _simulator_task.cancel()
         _simulator_task = None
@@ -706,6 +706,16 @@ def main():
             count = cursor.fetchone()[0]
             print(f"  {table}: {count:,} records")
 
+        # Drop cached /cities responses so running API workers serve the
+        # fresh data immediately instead of after the cache TTL
+        try:
+            import asyncio
+            from api import cache
+            deleted = asyncio.run(cache.invalidate_prefix(cache.CITIES_PREFIX))
+            print(f"\nInvalidated {deleted} cached cities entries")
+        except Exception as e:
+            print(f"\nCache invalidation skipped: {e}")
+
     except Exception as e:
         print(f"\nError during pipeline execution: {str(e)}")
         import traceback